@@ -9,6 +9,7 @@
 # SPDX-License-Identifier: GPL-2.0-only
 #
 
+import codecs
 import re
 from enum import Enum
 from collections import namedtuple
@@ -49,32 +50,69 @@ class BitbakeParser:
     __def_regexp__ = re.compile(r"def\s+(\w+).*:")
     __python_func_regexp__ = re.compile(r"(\s+.*)|(^$)|(^#)")
     __python_tab_regexp__ = re.compile(r" *\t")
+    __ascii_sample__ = "\r\n\t #\\"
 
-    def __init__(self: "BitbakeParser", visitor: BitbakeVisitorBase) -> None:
+    def __init__(
+        self: "BitbakeParser",
+        visitor: BitbakeVisitorBase,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+    ) -> None:
         self.__initialize()
         self.__visitor: BitbakeVisitorBase = visitor
         self.__conf_parser: ConfParser = ConfParser(visitor)
+        # lines are split and skipped as bytes, so encoding must be ASCII compatible.
+        # encode twice, so that a BOM (e.g. of utf-8-sig) written only once is ignored
+        encoder = codecs.lookup(encoding).incrementalencoder()
+        encoder.encode(self.__ascii_sample__)
+        if encoder.encode(self.__ascii_sample__) != self.__ascii_sample__.encode("ascii"):
+            raise ValueError(f"encoding must be ASCII compatible: {encoding}")
+        self.__encoding: str = encoding
+        self.__errors: str = errors
 
     def parse(self: "BitbakeParser", absolute_file_path: str) -> List[str]:
+        with open(absolute_file_path, "rb") as f:
+            return self.parse_bytes(absolute_file_path, f.read())
+
+    def parse_bytes(self: "BitbakeParser", absolute_file_path: str, content: bytes) -> List[str]:
         conf_contents: List[str] = []
 
         self.__initialize()
-        with open(absolute_file_path, "r") as f:
-            lineno = 0
-            while True:
-                lineno = lineno + 1
-                s = f.readline()
-                if not s:
-                    break
-                s = s.rstrip()
-                ret: Optional[str] = self.__feeder(absolute_file_path, lineno, s)
-                conf_contents.append(ret or "")
+        encoding: str = self.__encoding
+        errors: str = self.__errors
+        is_strict: bool = errors == "strict"
+        lineno = 0
+        for raw in content.splitlines():
+            lineno = lineno + 1
+            # blank and comment lines don't affect anything while no statement is pending
+            if self.__is_idle() and self.__is_skippable(raw):
+                # skipped lines are still validated in strict mode, as if they were decoded
+                if is_strict and not raw.isascii():
+                    raw.decode(encoding, errors)
+                conf_contents.append("")
+                continue
+            s = raw.decode(encoding, errors).rstrip()
+            ret: Optional[str] = self.__feeder(absolute_file_path, lineno, s)
+            conf_contents.append(ret or "")
+        lineno = lineno + 1
         if self.__inpython__:
             self.__feeder(absolute_file_path, lineno, "", eof=True)
         self.__teardown()
 
         return conf_contents
 
+    @staticmethod
+    def __is_skippable(raw: bytes) -> bool:
+        stripped: bytes = raw.rstrip()
+        if not stripped:
+            return True
+        # str.rstrip() strips more than bytes.rstrip() (e.g. "\x1c" or unicode spaces),
+        # so such a tail may hide a line continuation
+        return stripped[0] == 0x23 and stripped[-1] != 0x5C and 0x20 <= stripped[-1] < 0x80
+
+    def __is_idle(self: "BitbakeParser") -> bool:
+        return not (self.__infunc__ or self.__inpython__ or self.__residue__)
+
     def __initialize(self: "BitbakeParser"):
         self.__teardown()
 
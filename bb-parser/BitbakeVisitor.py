@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
 from collections import namedtuple
 from xml.etree.ElementInclude import include
@@ -130,6 +130,15 @@ class BitbakeVisitorBase:
     ) -> None:
         pass
 
+    # Layer collection events
+    def recipe_begin_callback(
+        self: "BitbakeVisitorBase", file_path: str, append_paths: List[str]
+    ) -> None:
+        pass
+
+    def recipe_end_callback(self: "BitbakeVisitorBase", file_path: str) -> None:
+        pass
+
     # other events
     def warning_callback(
         self: "BitbakeVisitorBase", file_path: str, lineno: int, detail: str
@@ -140,3 +149,217 @@ class BitbakeVisitorBase:
         self: "BitbakeVisitorBase", file_path: str, lineno: int, detail: str
     ) -> None:
         pass
+
+
+class RecordingVisitor(BitbakeVisitorBase):
+    """
+    Visitor which records parser events as (callback name, file_path, arguments).
+    """
+
+    def __init__(self: "RecordingVisitor") -> None:
+        self.events: List[Tuple[str, str, Tuple[Any, ...]]] = []
+
+    # Bitbake parser events
+    def function_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        head: FunctionHeader,
+        body: FunctionBody,
+    ) -> None:
+        self.events.append(
+            ("function_callback", file_path, (start_lineno, cur_lineno, head, body))
+        )
+
+    def python_function_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        head: FunctionHeader,
+        body: FunctionBody,
+    ) -> None:
+        self.events.append(
+            (
+                "python_function_callback",
+                file_path,
+                (start_lineno, cur_lineno, head, body),
+            )
+        )
+
+    def export_function_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        function_name: str,
+        start: Position,
+        end: Position,
+    ) -> None:
+        self.events.append(
+            (
+                "export_function_callback",
+                file_path,
+                (start_lineno, cur_lineno, function_name, start, end),
+            )
+        )
+
+    def add_task_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        added_task: SymbolInfo,
+        before: List[SymbolInfo],
+        after: List[SymbolInfo],
+    ) -> None:
+        self.events.append(
+            (
+                "add_task_callback",
+                file_path,
+                (start_lineno, cur_lineno, added_task, before, after),
+            )
+        )
+
+    def delete_task_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        deleted_task: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            (
+                "delete_task_callback",
+                file_path,
+                (start_lineno, cur_lineno, deleted_task),
+            )
+        )
+
+    def add_handler_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        handler_task: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            (
+                "add_handler_callback",
+                file_path,
+                (start_lineno, cur_lineno, handler_task),
+            )
+        )
+
+    def inherit_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        inherit_target_names: List[SymbolInfo],
+    ) -> None:
+        self.events.append(
+            (
+                "inherit_callback",
+                file_path,
+                (start_lineno, cur_lineno, inherit_target_names),
+            )
+        )
+
+    # Conf parser events
+    def config_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        is_export: bool,
+        variable: VariableInfo,
+        flag: Optional[SymbolInfo],
+        operator: OperatorInfo,
+        value: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            (
+                "config_callback",
+                file_path,
+                (start_lineno, cur_lineno, is_export, variable, flag, operator, value),
+            )
+        )
+
+    def include_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        include_target: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            ("include_callback", file_path, (start_lineno, cur_lineno, include_target))
+        )
+
+    def require_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        require_target: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            ("require_callback", file_path, (start_lineno, cur_lineno, require_target))
+        )
+
+    def export_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        export_target: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            ("export_callback", file_path, (start_lineno, cur_lineno, export_target))
+        )
+
+    def unset_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        unset_target: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            ("unset_callback", file_path, (start_lineno, cur_lineno, unset_target))
+        )
+
+    def unset_flag_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        unset_flag_target: SymbolInfo,
+        unset_flag: SymbolInfo,
+    ) -> None:
+        self.events.append(
+            (
+                "unset_flag_callback",
+                file_path,
+                (start_lineno, cur_lineno, unset_flag_target, unset_flag),
+            )
+        )
+
+    # other events
+    def warning_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        lineno: int,
+        detail: str,
+    ) -> None:
+        self.events.append(("warning_callback", file_path, (lineno, detail)))
+
+    def error_callback(
+        self: "RecordingVisitor",
+        file_path: str,
+        lineno: int,
+        detail: str,
+    ) -> None:
+        self.events.append(("error_callback", file_path, (lineno, detail)))
@@ -0,0 +1,75 @@
+"""
+   class for parsing many files, lexing each unique file content only once
+"""
+
+import hashlib
+import uuid
+from collections import namedtuple
+from typing import Any, Dict, List
+
+from BitbakeParser import BitbakeParser
+from BitbakeVisitor import BitbakeVisitorBase, RecordingVisitor
+
+# recorded result of one unique file content
+ParseResult = namedtuple("ParseResult", ["events", "conf_contents"])
+
+
+class DeduplicatingParser:
+    """
+    Parses files like BitbakeParser, but files sharing the same content are
+    lexed only once. The recorded events are replayed for every path, with
+    file_path filled in. Positions are relative to the content itself, so they
+    are replayed as they are.
+    """
+
+    # callbacks whose last argument is a message which may contain the file path
+    __message_callbacks__ = ["warning_callback", "error_callback"]
+
+    def __init__(
+        self: "DeduplicatingParser",
+        visitor: BitbakeVisitorBase,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+    ) -> None:
+        self.__visitor: BitbakeVisitorBase = visitor
+        self.__recorder: RecordingVisitor = RecordingVisitor()
+        self.__parser: BitbakeParser = BitbakeParser(self.__recorder, encoding, errors)
+        self.__results: Dict[bytes, ParseResult] = {}
+        # contents are parsed with this path, so that messages become templates of the path
+        self.__placeholder: str = f"<file-{uuid.uuid4().hex}>"
+
+    def parse(self: "DeduplicatingParser", absolute_file_path: str) -> List[str]:
+        with open(absolute_file_path, "rb") as f:
+            content: bytes = f.read()
+
+        digest: bytes = hashlib.sha256(content).digest()
+        result: ParseResult = self.__results.get(digest)
+        if result is None:
+            self.__recorder.events = []
+            conf_contents: List[str] = self.__parser.parse_bytes(self.__placeholder, content)
+            result = ParseResult(self.__recorder.events, conf_contents)
+            self.__results[digest] = result
+
+        self.__replay(absolute_file_path, result)
+        return list(result.conf_contents)
+
+    @classmethod
+    def __copy(cls, value: Any) -> Any:
+        # visitors may modify lists in arguments, which must not change the recorded events
+        if isinstance(value, list):
+            return [cls.__copy(item) for item in value]
+        if isinstance(value, tuple):
+            items: List[Any] = [cls.__copy(item) for item in value]
+            return type(value)(*items) if hasattr(value, "_fields") else tuple(items)
+        return value
+
+    def __replay(
+        self: "DeduplicatingParser", absolute_file_path: str, result: ParseResult
+    ) -> None:
+        for name, _, args in result.events:
+            if name in self.__message_callbacks__:
+                lineno, detail = args
+                args = (lineno, detail.replace(self.__placeholder, absolute_file_path))
+            else:
+                args = self.__copy(args)
+            getattr(self.__visitor, name)(absolute_file_path, *args)
@@ -0,0 +1,460 @@
+"""
+   classes for parsing files on worker processes via a coordinator
+"""
+
+import argparse
+import heapq
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from BitbakeVisitor import (
+    BitbakeVisitorBase,
+    FunctionBody,
+    FunctionHeader,
+    OperatorInfo,
+    Position,
+    RecordingVisitor,
+    SymbolInfo,
+    VariableInfo,
+)
+from BitbakeParser import BitbakeParser
+from DeduplicatingParser import DeduplicatingParser
+
+# shard and report definitions
+Shard = namedtuple("Shard", ["index", "file_paths", "size"])
+WorkerStats = namedtuple(
+    "WorkerStats", ["address", "shards", "files", "bytes", "seconds", "failures"]
+)
+
+# namedtuples which can appear in event arguments
+__event_types__ = {
+    "Position": Position,
+    "FunctionHeader": FunctionHeader,
+    "FunctionBody": FunctionBody,
+    "SymbolInfo": SymbolInfo,
+    "VariableInfo": VariableInfo,
+    "OperatorInfo": OperatorInfo,
+}
+__event_type_names__ = {event_type: name for name, event_type in __event_types__.items()}
+
+__frame_header__ = struct.Struct(">I")
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _encode_value(value: Any) -> Any:
+    name: Optional[str] = __event_type_names__.get(type(value))
+    if name is not None:
+        return {"t": name, "v": [_encode_value(field) for field in value]}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(item) for item in value]
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return __event_types__[value["t"]](*[_decode_value(field) for field in value["v"]])
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    return value
+
+
+def _send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    payload: bytes = zlib.compress(
+        json.dumps(message, separators=(",", ":")).encode("utf-8"), 1
+    )
+    sock.sendall(__frame_header__.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks: List[bytes] = []
+    while size:
+        chunk: bytes = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Dict[str, Any]:
+    (size,) = __frame_header__.unpack(_recv_exact(sock, __frame_header__.size))
+    return json.loads(zlib.decompress(_recv_exact(sock, size)).decode("utf-8"))
+
+
+def _sign(secret: Optional[str], nonce: str) -> str:
+    if secret is None:
+        return ""
+    return hmac.new(secret.encode("utf-8"), nonce.encode("utf-8"), "sha256").hexdigest()
+
+
+class ParseWorker:
+    """
+    Serves parse requests of a coordinator. File paths are opened as they are,
+    so workers on other hosts need the same file tree (e.g. a shared filesystem).
+    Coordinators must prove the shared secret (if any) within auth_timeout,
+    and only files under root_dirs (if any) are parsed. Each connection is
+    served on its own thread, so that a coordinator never blocks another one.
+    """
+
+    def __init__(
+        self: "ParseWorker",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        secret: Optional[str] = None,
+        root_dirs: Optional[List[str]] = None,
+        auth_timeout: float = 10.0,
+    ) -> None:
+        self.__server: socket.socket = socket.create_server((host, port))
+        self.__auth_timeout: float = auth_timeout
+        self.__secret: Optional[str] = secret
+        self.__root_dirs: Optional[List[str]] = (
+            None if root_dirs is None else [os.path.realpath(d) for d in root_dirs]
+        )
+
+    def get_address(self: "ParseWorker") -> Tuple[str, int]:
+        return self.__server.getsockname()[:2]
+
+    def serve_forever(self: "ParseWorker") -> None:
+        while True:
+            connection, peer = self.__server.accept()
+            threading.Thread(
+                target=self.__handle_connection, args=(connection, peer), daemon=True
+            ).start()
+
+    def __handle_connection(
+        self: "ParseWorker", connection: socket.socket, peer: Tuple[str, int]
+    ) -> None:
+        # a broken connection must not stop the worker
+        try:
+            with connection:
+                self.__serve_connection(connection)
+        except Exception as e:
+            logger.warning("connection from %s:%s aborted: %r", peer[0], peer[1], e)
+
+    def __is_allowed(self: "ParseWorker", file_path: str) -> bool:
+        if self.__root_dirs is None:
+            return True
+        real_path: str = os.path.realpath(file_path)
+        return any(
+            os.path.commonpath([root_dir, real_path]) == root_dir
+            for root_dir in self.__root_dirs
+        )
+
+    def __authenticate(self: "ParseWorker", connection: socket.socket) -> bool:
+        nonce: str = secrets.token_hex(16)
+        _send_frame(connection, {"nonce": nonce})
+        response: Dict[str, Any] = _recv_frame(connection)
+        return hmac.compare_digest(str(response.get("auth", "")), _sign(self.__secret, nonce))
+
+    def __serve_connection(self: "ParseWorker", connection: socket.socket) -> None:
+        # an idle client must not hold the connection before authentication
+        connection.settimeout(self.__auth_timeout)
+        if not self.__authenticate(connection):
+            raise PermissionError("authentication failed")
+        connection.settimeout(None)
+
+        recorder: RecordingVisitor = RecordingVisitor()
+        parsers: Dict[Tuple[str, str], DeduplicatingParser] = {}
+        while True:
+            try:
+                request: Dict[str, Any] = _recv_frame(connection)
+            except ConnectionError:
+                return
+            if "quit" in request:
+                return
+
+            started: float = time.perf_counter()
+            options: Tuple[str, str] = (request["encoding"], request["errors"])
+            if options not in parsers:
+                parsers[options] = DeduplicatingParser(recorder, *options)
+            parser: DeduplicatingParser = parsers[options]
+            for index, file_path in enumerate(request["file_paths"]):
+                recorder.events = []
+                try:
+                    if not self.__is_allowed(file_path):
+                        raise PermissionError(f"not under root directories of worker: {file_path}")
+                    parser.parse(file_path)
+                except Exception as e:
+                    recorder.error_callback(file_path, 0, f"failed to parse: {e}")
+                events = [[name, _encode_value(args)] for name, _, args in recorder.events]
+                _send_frame(connection, {"file": index, "events": events})
+            _send_frame(connection, {"done": time.perf_counter() - started})
+
+
+def _run_local_worker(
+    host: str, secret: Optional[str], root_dirs: Optional[List[str]], connection
+) -> None:
+    worker: ParseWorker = ParseWorker(host, 0, secret, root_dirs)
+    connection.send(worker.get_address())
+    connection.close()
+    worker.serve_forever()
+
+
+class DistributedParser:
+    """
+    Coordinator which shards files into size balanced bins, hands them to
+    workers over sockets and replays the results to the visitor in the order
+    of given files. Shards of a failed worker are retried on other workers.
+    """
+
+    def __init__(
+        self: "DistributedParser",
+        visitor: BitbakeVisitorBase,
+        worker_addresses: List[Tuple[str, int]],
+        shards_per_worker: int = 4,
+        max_retries: int = 2,
+        timeout: Optional[float] = 600.0,
+        secret: Optional[str] = None,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+    ) -> None:
+        # fail here rather than on every worker
+        BitbakeParser(BitbakeVisitorBase(), encoding, errors)
+        self.__visitor: BitbakeVisitorBase = visitor
+        self.__worker_addresses: List[Tuple[str, int]] = worker_addresses
+        self.__shards_per_worker: int = shards_per_worker
+        self.__max_retries: int = max_retries
+        self.__timeout: Optional[float] = timeout
+        self.__secret: Optional[str] = secret
+        self.__encoding: str = encoding
+        self.__errors: str = errors
+        self.__stats: Dict[Tuple[str, int], WorkerStats] = {}
+
+    @staticmethod
+    def spawn_local_workers(
+        count: int,
+        host: str = "127.0.0.1",
+        secret: Optional[str] = None,
+        root_dirs: Optional[List[str]] = None,
+    ) -> Tuple[List[Tuple[str, int]], List[multiprocessing.Process]]:
+        addresses: List[Tuple[str, int]] = []
+        processes: List[multiprocessing.Process] = []
+        for _ in range(count):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_run_local_worker, args=(host, secret, root_dirs, sender), daemon=True
+            )
+            process.start()
+            sender.close()
+            addresses.append(tuple(receiver.recv()))
+            receiver.close()
+            processes.append(process)
+        return addresses, processes
+
+    @staticmethod
+    def make_shards(file_paths: List[str], shard_count: int) -> List[Shard]:
+        sizes: Dict[str, int] = {
+            file_path: os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+            for file_path in file_paths
+        }
+        shard_count = max(1, min(shard_count, len(file_paths)))
+        bins: List[Tuple[int, int, List[str]]] = [(0, i, []) for i in range(shard_count)]
+        # largest first into the lightest bin
+        for file_path in sorted(file_paths, key=lambda f: sizes[f], reverse=True):
+            size, index, paths = heapq.heappop(bins)
+            paths.append(file_path)
+            heapq.heappush(bins, (size + sizes[file_path], index, paths))
+        return [
+            Shard(index, paths, size) for size, index, paths in sorted(bins, key=lambda b: b[1]) if paths
+        ]
+
+    def get_stats(self: "DistributedParser") -> List[WorkerStats]:
+        return list(self.__stats.values())
+
+    def parse(self: "DistributedParser", file_paths: List[str]) -> List[WorkerStats]:
+        # each path is parsed once
+        file_paths = list(dict.fromkeys(file_paths))
+        shards: List[Shard] = self.make_shards(
+            file_paths, len(self.__worker_addresses) * self.__shards_per_worker
+        )
+        tasks: "queue.Queue[Optional[Shard]]" = queue.Queue()
+        results: "queue.Queue[Tuple[str, Any, Any]]" = queue.Queue()
+        for shard in shards:
+            tasks.put(shard)
+        self.__stats = {
+            address: WorkerStats(address, 0, 0, 0, 0.0, 0)
+            for address in self.__worker_addresses
+        }
+
+        threads: List[threading.Thread] = [
+            threading.Thread(target=self.__drive_worker, args=(address, tasks, results), daemon=True)
+            for address in self.__worker_addresses
+        ]
+        for thread in threads:
+            thread.start()
+
+        order: Dict[str, int] = {file_path: i for i, file_path in enumerate(file_paths)}
+        parsed: List[Optional[List[Tuple[str, Tuple[Any, ...]]]]] = [None] * len(file_paths)
+        next_file: int = 0
+        attempts: Dict[int, int] = {}
+        remaining: int = len(shards)
+        alive: int = len(threads)
+
+        while remaining:
+            kind, shard, payload = results.get()
+            if kind == "dead":
+                alive -= 1
+                if alive == 0:
+                    remaining -= self.__fail_pending(tasks, parsed, order, "no worker available")
+                    next_file = self.__flush(file_paths, parsed, next_file)
+                continue
+            if kind == "failed":
+                attempts[shard.index] = attempts.get(shard.index, 0) + 1
+                if attempts[shard.index] <= self.__max_retries and alive:
+                    tasks.put(shard)
+                    continue
+                payload = [
+                    [("error_callback", (0, f"failed to parse on workers: {payload}"))]
+                    for _ in shard.file_paths
+                ]
+            for file_path, events in zip(shard.file_paths, payload):
+                parsed[order[file_path]] = events
+            remaining -= 1
+            next_file = self.__flush(file_paths, parsed, next_file)
+
+        for _ in threads:
+            tasks.put(None)
+        for thread in threads:
+            thread.join()
+        return self.get_stats()
+
+    def __flush(
+        self: "DistributedParser",
+        file_paths: List[str],
+        parsed: List[Optional[List[Tuple[str, Tuple[Any, ...]]]]],
+        next_file: int,
+    ) -> int:
+        # replay files in the given order, as soon as all preceding files are done
+        while next_file < len(file_paths) and parsed[next_file] is not None:
+            for name, args in parsed[next_file]:
+                getattr(self.__visitor, name)(file_paths[next_file], *args)
+            parsed[next_file] = []
+            next_file += 1
+        return next_file
+
+    def __fail_pending(
+        self: "DistributedParser",
+        tasks: "queue.Queue[Optional[Shard]]",
+        parsed: List[Optional[List[Tuple[str, Tuple[Any, ...]]]]],
+        order: Dict[str, int],
+        reason: str,
+    ) -> int:
+        failed: int = 0
+        while True:
+            try:
+                shard: Optional[Shard] = tasks.get_nowait()
+            except queue.Empty:
+                return failed
+            if shard is None:
+                continue
+            failed += 1
+            for file_path in shard.file_paths:
+                parsed[order[file_path]] = [
+                    ("error_callback", (0, f"failed to parse on workers: {reason}"))
+                ]
+
+    def __drive_worker(
+        self: "DistributedParser",
+        address: Tuple[str, int],
+        tasks: "queue.Queue[Optional[Shard]]",
+        results: "queue.Queue[Tuple[str, Any, Any]]",
+    ) -> None:
+        try:
+            connection: socket.socket = socket.create_connection(address, self.__timeout)
+            challenge: Dict[str, Any] = _recv_frame(connection)
+            _send_frame(connection, {"auth": _sign(self.__secret, challenge["nonce"])})
+        except Exception:
+            self.__update_stats(address, failures=1)
+            results.put(("dead", None, None))
+            return
+
+        with connection:
+            while True:
+                shard: Optional[Shard] = tasks.get()
+                if shard is None:
+                    try:
+                        _send_frame(connection, {"quit": True})
+                    except OSError:
+                        pass
+                    return
+                try:
+                    events, seconds = self.__request_shard(connection, shard)
+                except Exception as e:
+                    # includes malformed responses, e.g. from a worker of another version
+                    self.__update_stats(address, failures=1)
+                    results.put(("failed", shard, f"{address[0]}:{address[1]} {e}"))
+                    results.put(("dead", None, None))
+                    return
+                self.__update_stats(
+                    address, shards=1, files=len(shard.file_paths), bytes=shard.size, seconds=seconds
+                )
+                results.put(("done", shard, events))
+
+    def __request_shard(
+        self: "DistributedParser", connection: socket.socket, shard: Shard
+    ) -> Tuple[List[List[Tuple[str, Tuple[Any, ...]]]], float]:
+        _send_frame(
+            connection,
+            {"file_paths": shard.file_paths, "encoding": self.__encoding, "errors": self.__errors},
+        )
+        events: List[List[Tuple[str, Tuple[Any, ...]]]] = [[] for _ in shard.file_paths]
+        while True:
+            response: Dict[str, Any] = _recv_frame(connection)
+            if "done" in response:
+                return events, response["done"]
+            events[response["file"]] = [
+                (name, tuple(_decode_value(args))) for name, args in response["events"]
+            ]
+
+    def __update_stats(self: "DistributedParser", address: Tuple[str, int], **increments) -> None:
+        stats: WorkerStats = self.__stats[address]
+        self.__stats[address] = stats._replace(
+            **{key: getattr(stats, key) + value for key, value in increments.items()}
+        )
+
+
+def format_stats(stats: List[WorkerStats]) -> str:
+    lines: List[str] = []
+    for s in stats:
+        seconds: float = s.seconds or float("inf")
+        lines.append(
+            f"{s.address[0]}:{s.address[1]}  shards={s.shards} files={s.files} "
+            f"failures={s.failures} {s.files / seconds:.1f} files/s "
+            f"{s.bytes / seconds / 1024 / 1024:.2f} MiB/s"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="bb-parser worker")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--root", action="append", dest="root_dirs", help="directory allowed to be parsed"
+    )
+    args = parser.parse_args()
+
+    # the secret is given by environment variable, not to be shown in process list
+    secret: Optional[str] = os.environ.get("BB_PARSER_SECRET")
+    if secret is None and args.host not in ("127.0.0.1", "::1", "localhost"):
+        print("BB_PARSER_SECRET is required to listen on non-loopback address", file=sys.stderr)
+        sys.exit(1)
+    ParseWorker(args.host, args.port, secret, args.root_dirs).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+   class for collecting recipes and bbappends over layers
+"""
+
+import os
+from collections import namedtuple
+from typing import Dict, List, Optional, Set
+
+from BitbakeParser import BitbakeParser
+from BitbakeVisitor import (
+    BitbakeVisitorBase,
+    OperatorInfo,
+    SymbolInfo,
+    VariableInfo,
+)
+from DeduplicatingParser import DeduplicatingParser
+
+# layer and file entry definitions
+LayerInfo = namedtuple("LayerInfo", ["path", "priority", "index"])
+AppendInfo = namedtuple("AppendInfo", ["path", "stem", "layer"])
+RecipeInfo = namedtuple("RecipeInfo", ["path", "stem", "layer"])
+
+
+class _LayerConfVisitor(BitbakeVisitorBase):
+    def __init__(self: "_LayerConfVisitor") -> None:
+        self.priority: Optional[int] = None
+
+    def config_callback(
+        self: "_LayerConfVisitor",
+        file_path: str,
+        start_lineno: int,
+        cur_lineno: int,
+        is_export: bool,
+        variable: VariableInfo,
+        flag: Optional[SymbolInfo],
+        operator: OperatorInfo,
+        value: SymbolInfo,
+    ) -> None:
+        if not variable.name.startswith("BBFILE_PRIORITY"):
+            return
+        try:
+            self.priority = int(value.name)
+        except ValueError:
+            pass
+
+
+class LayerCollection:
+    """
+    Collects .bb and .bbappend files of layers and parses each recipe together
+    with its bbappends, in the order bitbake would apply them.
+    """
+
+    __default_priority__ = 0
+
+    def __init__(
+        self: "LayerCollection",
+        visitor: BitbakeVisitorBase,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+    ) -> None:
+        self.__visitor: BitbakeVisitorBase = visitor
+        self.__parser: DeduplicatingParser = DeduplicatingParser(visitor, encoding, errors)
+        self.__layers: List[LayerInfo] = []
+        self.__recipes: List[RecipeInfo] = []
+        # bbappends indexed by the file name, e.g. "foo_1.0" of "foo_1.0.bbappend"
+        self.__appends: Dict[str, List[AppendInfo]] = {}
+        # bbappends indexed by the prefix before wildcard, e.g. "foo_1." of "foo_1.%.bbappend"
+        self.__wildcard_appends: Dict[str, List[AppendInfo]] = {}
+
+    def add_layer(
+        self: "LayerCollection", layer_path: str, priority: Optional[int] = None
+    ) -> None:
+        if priority is None:
+            priority = self.__read_layer_priority(layer_path)
+        layer: LayerInfo = LayerInfo(layer_path, priority, len(self.__layers))
+        self.__layers.append(layer)
+
+        for root, dirs, files in os.walk(layer_path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path: str = os.path.join(root, file_name)
+                if file_name.endswith(".bb"):
+                    stem: str = file_name[: -len(".bb")]
+                    self.__recipes.append(RecipeInfo(file_path, stem, layer))
+                elif file_name.endswith(".bbappend"):
+                    stem: str = file_name[: -len(".bbappend")]
+                    self.__add_append(AppendInfo(file_path, stem, layer))
+
+    def get_appends(self: "LayerCollection", recipe_path: str) -> List[str]:
+        stem: str = os.path.basename(recipe_path)[: -len(".bb")]
+        return [append.path for append in self.__find_appends(stem)]
+
+    def parse(self: "LayerCollection") -> None:
+        matched: Set[str] = set()
+        for recipe in self.__recipes:
+            appends: List[AppendInfo] = self.__find_appends(recipe.stem)
+            append_paths: List[str] = [append.path for append in appends]
+            matched.update(append_paths)
+
+            self.__visitor.recipe_begin_callback(recipe.path, append_paths)
+            self.__parser.parse(recipe.path)
+            for append_path in append_paths:
+                self.__parser.parse(append_path)
+            self.__visitor.recipe_end_callback(recipe.path)
+
+        for index in (self.__appends, self.__wildcard_appends):
+            for appends in index.values():
+                for append in appends:
+                    if append.path not in matched:
+                        self.__warn_dangling_append(append)
+
+    def __read_layer_priority(self: "LayerCollection", layer_path: str) -> int:
+        layer_conf: str = os.path.join(layer_path, "conf", "layer.conf")
+        if not os.path.isfile(layer_conf):
+            return self.__default_priority__
+        visitor: _LayerConfVisitor = _LayerConfVisitor()
+        BitbakeParser(visitor).parse(layer_conf)
+        if visitor.priority is None:
+            return self.__default_priority__
+        return visitor.priority
+
+    def __add_append(self: "LayerCollection", append: AppendInfo) -> None:
+        wildcard: int = append.stem.find("%")
+        if wildcard < 0:
+            self.__appends.setdefault(append.stem, []).append(append)
+        else:
+            self.__wildcard_appends.setdefault(append.stem[:wildcard], []).append(append)
+
+    def __find_appends(self: "LayerCollection", recipe_stem: str) -> List[AppendInfo]:
+        # lookups per prefix of the recipe name, regardless of the number of bbappends
+        appends: List[AppendInfo] = list(self.__appends.get(recipe_stem, []))
+        for end in range(len(recipe_stem) + 1):
+            appends.extend(self.__wildcard_appends.get(recipe_stem[:end], []))
+        # lower priority first, so that higher priority layers are applied last
+        appends.sort(key=lambda a: (a.layer.priority, a.layer.index, a.path))
+        return appends
+
+    def __warn_dangling_append(self: "LayerCollection", append: AppendInfo) -> None:
+        self.__visitor.warning_callback(
+            append.path, 0, f"No recipes available for: {append.path}"
+        )
@@ -12,25 +12,16 @@ for YOCTO_VER in ${YOCTO_VERS[@]}; do
   repo init -b ${YOCTO_VER} -u https://github.com/AngryMane/raspberrypi-yocto &> /dev/null 
   repo sync &> /dev/null 
 
-  BB_FILES=(`find ./* -name *.bb`)
-  for target in ${BB_FILES[@]}; do
-    ./test_main.py ${target} > /dev/null
-  done
-
-  BBAPPEND_FILES=(`find ./* -name *.bbappend`)
-  for target in ${BBAPPEND_FILES[@]}; do
-    ./test_main.py ${target} > /dev/null
-  done
+  LAYERS=(`find ./* -path "*/conf/layer.conf" | xargs -n1 dirname | xargs -n1 dirname`)
+  ./test_main.py ${LAYERS[@]} > /dev/null
 
   INC_FILES=(`find ./* -name *.inc`)
-  for target in ${INC_FILES[@]}; do
-    ./test_main.py ${target} > /dev/null
-  done
+  ./test_main.py ${INC_FILES[@]} > /dev/null
 
   CONF_FILES=(`find ./* -name *.conf`)
-  for target in ${CONF_FILES[@]}; do
-    ./test_main.py ${target} > /dev/null
-  done
+  ./test_main.py ${CONF_FILES[@]} > /dev/null
+
+  ./test_main.py --workers 4 ${INC_FILES[@]} ${CONF_FILES[@]}
 
   #rm -rf poky &> /dev/null
   #rm -rf .repo &> /dev/null
@@ -8,7 +8,10 @@ target_path = current_pash + "/../bb-parser"
 sys.path.append(target_path)
 
 from BitbakeParser import BitbakeParser
-from BitbakeVisitor import BitbakeVisitorBase
+from BitbakeVisitor import BitbakeVisitorBase, RecordingVisitor
+from DeduplicatingParser import DeduplicatingParser
+from DistributedParser import DistributedParser, format_stats
+from LayerCollection import LayerCollection
 
 
 class TestVisitor(BitbakeVisitorBase):
@@ -23,8 +26,50 @@ class TestVisitor(BitbakeVisitorBase):
         print(f"[ERROR]{file_path}:{lineno}  {detail}")
 
 
+def check_workers(worker_count: int, file_paths: list) -> None:
+    # parse on local worker processes, and compare with parsing in this process
+    expected: RecordingVisitor = RecordingVisitor()
+    deduplicating_parser: DeduplicatingParser = DeduplicatingParser(expected)
+    for target in file_paths:
+        try:
+            deduplicating_parser.parse(target)
+        except Exception as e:
+            # workers report failed files as error events
+            expected.error_callback(target, 0, f"failed to parse: {e}")
+
+    addresses, processes = DistributedParser.spawn_local_workers(worker_count)
+    actual: RecordingVisitor = RecordingVisitor()
+    stats = DistributedParser(actual, addresses).parse(file_paths)
+    for process in processes:
+        process.terminate()
+
+    print(format_stats(stats))
+    if actual.events != expected.events:
+        print(f"[ERROR]event stream of {worker_count} workers differs from single process")
+        sys.exit(1)
+
+
 def main() -> None:
-    if len(sys.argv) < 2 or not os.path.isfile(sys.argv[1]):
+    if len(sys.argv) < 2:
+        return
+    if sys.argv[1] == "--workers":
+        check_workers(
+            int(sys.argv[2]), [target for target in sys.argv[3:] if os.path.isfile(target)]
+        )
+        return
+    if os.path.isdir(sys.argv[1]):
+        collection: LayerCollection = LayerCollection(TestVisitor())
+        for layer_path in sys.argv[1:]:
+            collection.add_layer(layer_path)
+        collection.parse()
+        return
+    if 2 < len(sys.argv):
+        deduplicating_parser: DeduplicatingParser = DeduplicatingParser(TestVisitor())
+        for target in sys.argv[1:]:
+            if os.path.isfile(target):
+                deduplicating_parser.parse(target)
+        return
+    if not os.path.isfile(sys.argv[1]):
         return
     parser: BitbakeParser = BitbakeParser(TestVisitor())
     parser.parse(sys.argv[1])